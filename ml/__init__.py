@@ -1,5 +1,28 @@
 from ml.predictor_lr import LRPredictor
-from ml.dataset_builder import build_features, build_labels
-from ml.train_lr import train_lr_model
+from ml.dataset_builder import (
+    FeatureState,
+    build_features,
+    build_features_chunked,
+    build_features_tail,
+    build_labels,
+    load_bars,
+)
 
-__all__ = ['LRPredictor', 'build_features', 'build_labels', 'train_lr_model']
+__all__ = [
+    'LRPredictor',
+    'FeatureState',
+    'build_features',
+    'build_features_chunked',
+    'build_features_tail',
+    'build_labels',
+    'load_bars',
+    'train_lr_model',
+]
+
+
+def __getattr__(name):
+    # Imported lazily so the prediction path never pulls in scikit-learn
+    if name == 'train_lr_model':
+        from ml.train_lr import train_lr_model
+        return train_lr_model
+    raise AttributeError(f"module 'ml' has no attribute {name!r}")
@@ -0,0 +1,381 @@
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+    numba.set_num_threads(min(8, numba.config.NUMBA_NUM_THREADS))
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Fallback when numba is missing: run the kernels as plain Python."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+FEATURE_NAMES = [
+    'returns_1', 'returns_5', 'returns_10',
+    'sma_10', 'sma_20', 'sma_50',
+    'sma_ratio_10_20', 'sma_ratio_10_50', 'price_to_sma_10', 'price_to_sma_20',
+    'std_10', 'std_20',
+    'bb_upper', 'bb_lower', 'bb_position',
+    'rsi_14',
+    'macd', 'macd_signal', 'macd_hist',
+    'atr_14',
+    'high_low_range', 'body_size', 'upper_shadow', 'lower_shadow',
+    'volume_sma_10', 'volume_ratio',
+    'momentum_10', 'momentum_20',
+]
+
+RETURNS_1, RETURNS_5, RETURNS_10 = 0, 1, 2
+SMA_10, SMA_20, SMA_50 = 3, 4, 5
+SMA_RATIO_10_20, SMA_RATIO_10_50, PRICE_TO_SMA_10, PRICE_TO_SMA_20 = 6, 7, 8, 9
+STD_10, STD_20 = 10, 11
+BB_UPPER, BB_LOWER, BB_POSITION = 12, 13, 14
+RSI_14 = 15
+MACD, MACD_SIGNAL, MACD_HIST = 16, 17, 18
+ATR_14 = 19
+HIGH_LOW_RANGE, BODY_SIZE, UPPER_SHADOW, LOWER_SHADOW = 20, 21, 22, 23
+VOLUME_SMA_10, VOLUME_RATIO = 24, 25
+MOMENTUM_10, MOMENTUM_20 = 26, 27
+
+N_FEATURES = len(FEATURE_NAMES)
+COLUMN_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Running indicator state carried between kernel calls. Slots:
+STATE_SEEN = 0          # bars consumed so far
+STATE_PIVOT = 1         # first close; running sums are centred on it
+STATE_SUM_10, STATE_SUM_20, STATE_SUM_50 = 2, 3, 4
+STATE_STD_10 = 5        # (sum, sumsq) pair used by rolling_std(w=10)
+STATE_STD_20 = 7        # (sum, sumsq) pair used by rolling_std(w=20)
+STATE_AVG_GAIN, STATE_AVG_LOSS = 9, 10
+STATE_TR_SUM = 11
+STATE_VOLUME_SUM = 12
+STATE_EMA_12, STATE_EMA_26, STATE_MACD_SIGNAL = 13, 14, 15
+STATE_SIZE = 16
+
+# Longest look-behind of any indicator (sma_50). A call that resumes from
+# saved state must pass at least this many already-seen bars in front of
+# the new ones (or all of them, if fewer have been seen).
+LOOKBACK = 50
+
+
+# fastmath without the no-NaN/no-inf assumptions, so the isfinite guard in
+# safe_div is not optimised away.
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+def new_state() -> np.ndarray:
+    """Return a zeroed state vector for a series with no bars seen yet."""
+    return np.zeros(STATE_SIZE, dtype=np.float64)
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def safe_div(a, b):
+    """
+    a / b, or 0.0 where the quotient is not finite (zero denominator, NaN input).
+
+    Operands are widened to float64 so the no-numba fallback gets inf/nan
+    rather than Python's ZeroDivisionError/OverflowError.
+    """
+    if b == 0.0:
+        # Also spares the fallback numpy's divide-by-zero warning
+        return 0.0
+    q = np.float64(a) / np.float64(b)
+    return q if np.isfinite(q) else 0.0
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def safe_recip(b):
+    """1 / b, or 0.0 where that is not finite, so b * safe_recip(d) matches safe_div(b, d)."""
+    if b == 0.0:
+        return 0.0
+    q = 1.0 / np.float64(b)
+    return q if np.isfinite(q) else 0.0
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def true_range(h, lo, prev_close):
+    """True range of one bar given the previous bar's close."""
+    return max(h - lo, abs(h - prev_close), abs(lo - prev_close))
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def rolling_std(x, w, out, start, seen, pivot, acc):
+    """
+    Rolling sample std (ddof=1) of `x` over `w` bars, written into `out`.
+
+    Rows x[start:] are new; out[k] receives the value for x[start + k].
+    Keeps a running sum and sum of squares in `acc`, adding the incoming
+    value and dropping the outgoing one, so the cost is O(n) regardless of
+    `w`. Values are centred on `pivot` and accumulated in float64 to limit
+    cancellation in the sumsq - sum^2 / w step, even for float32 input.
+    The first w - 1 bars of the series are 0.
+    """
+    s = acc[0]
+    s2 = acc[1]
+    for i in range(start, x.shape[0]):
+        g = seen + i - start
+        d = np.float64(x[i]) - pivot
+        s += d
+        s2 += d * d
+        if g >= w:
+            old = np.float64(x[i - w]) - pivot
+            s -= old
+            s2 -= old * old
+        if g >= w - 1:
+            out[i - start] = np.sqrt(max((s2 - s * s / w) / (w - 1), 0.0))
+        else:
+            out[i - start] = 0.0
+    acc[0] = s
+    acc[1] = s2
+
+
+def compute_features(open_, high, low, close, volume, out, state, start, has_volume):
+    """
+    Fill `out` with every feature for bars [start:].
+
+    Bars before `start` have already been folded into `state` and are only
+    read as look-behind (at least min(seen, LOOKBACK) of them); out[k]
+    receives the row for bar start + k. `state` is updated in place, so a
+    series can be featurised incrementally. Pass new_state() and start=0
+    to process a series from scratch.
+
+    `has_volume` is decided once by the caller for the whole series: with
+    no volume data the volume columns are written as constants (0 and 1)
+    instead of running the rolling volume mean.
+
+    Inputs and `out` are float32 to halve memory traffic; every bar is
+    widened to float64 on load and all accumulators stay float64.
+    Rows still inside an indicator's warmup window are written as 0 and
+    every division is guarded, so the matrix comes out NaN/inf-free for
+    finite input without a clean-up pass. Inputs must be finite: a NaN
+    would stay in the running sums, so callers forward-fill bad bars first.
+    """
+    seen = int(state[STATE_SEEN])
+    _pointwise_features(open_, high, low, close, out, start, seen)
+    if has_volume:
+        _compute_with_volume(volume, out, state, start, seen)
+    else:
+        _compute_no_volume(out, start, close.shape[0])
+    _serial_features(high, low, close, out, state, start)
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _compute_with_volume(volume, out, state, start, seen):
+    """volume_sma_10 and volume_ratio from a running 10-bar volume sum."""
+    volume_sum = state[STATE_VOLUME_SUM]
+    for i in range(start, volume.shape[0]):
+        g = seen + i - start
+        r = i - start
+        v = np.float64(volume[i])
+        volume_sum += v
+        if g >= 10:
+            volume_sum -= np.float64(volume[i - 10])
+        if g >= 9:
+            volume_sma = volume_sum / 10.0
+            out[r, VOLUME_SMA_10] = volume_sma
+            out[r, VOLUME_RATIO] = safe_div(v, volume_sma)
+        else:
+            out[r, VOLUME_SMA_10] = 0.0
+            out[r, VOLUME_RATIO] = 0.0
+    state[STATE_VOLUME_SUM] = volume_sum
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def _compute_no_volume(out, start, n):
+    """
+    Constant volume columns for series without volume data. The running
+    volume sum is left alone: a series of zero volumes would keep it at 0.
+    """
+    for r in range(n - start):
+        out[r, VOLUME_SMA_10] = 0.0
+        out[r, VOLUME_RATIO] = 1.0
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy', parallel=True)
+def _pointwise_features(open_, high, low, close, out, start, seen):
+    """
+    Columns that depend only on the bar itself and fixed look-behind
+    offsets (returns, momentum, candle shape). Rows are independent, so
+    they are spread over threads with prange.
+    """
+    for i in prange(start, close.shape[0]):
+        g = seen + i - start
+        r = i - start
+        c = np.float64(close[i])
+        h = np.float64(high[i])
+        lo = np.float64(low[i])
+        o = np.float64(open_[i])
+
+        if g >= 1:
+            prev = np.float64(close[i - 1])
+            out[r, RETURNS_1] = safe_div(c - prev, prev)
+        else:
+            out[r, RETURNS_1] = 0.0
+        if g >= 5:
+            prev = np.float64(close[i - 5])
+            out[r, RETURNS_5] = safe_div(c - prev, prev)
+        else:
+            out[r, RETURNS_5] = 0.0
+        if g >= 10:
+            prev = np.float64(close[i - 10])
+            out[r, RETURNS_10] = safe_div(c - prev, prev)
+            out[r, MOMENTUM_10] = c - prev
+        else:
+            out[r, RETURNS_10] = 0.0
+            out[r, MOMENTUM_10] = 0.0
+        out[r, MOMENTUM_20] = c - np.float64(close[i - 20]) if g >= 20 else 0.0
+
+        # Candle shape: the body's top and bottom are shared by body size
+        # and both shadows
+        body_top = c if c > o else o
+        body_bot = c if c < o else o
+        out[r, HIGH_LOW_RANGE] = safe_div(h - lo, c)
+        out[r, BODY_SIZE] = safe_div(body_top - body_bot, c)
+        out[r, UPPER_SHADOW] = safe_div(h - body_top, c)
+        out[r, LOWER_SHADOW] = safe_div(body_bot - lo, c)
+
+
+@njit(cache=True, fastmath=FASTMATH, error_model='numpy')
+def _serial_features(high, low, close, out, state, start):
+    """
+    Price columns built on running state (rolling windows, EMAs, RSI,
+    ATR) in a single sweep.
+
+    Rolling means are kept as running sums updated with the incoming and
+    outgoing bar, EMAs as recurrences, so the whole pass is O(n).
+    """
+    n = close.shape[0]
+    if n <= start:
+        return
+
+    # adjust=False EMA weights: alpha = 2 / (span + 1)
+    alpha_12 = 2.0 / (12 + 1)
+    alpha_26 = 2.0 / (26 + 1)
+    alpha_9 = 2.0 / (9 + 1)
+
+    seen = int(state[STATE_SEEN])
+    if seen == 0:
+        # Seeding both EMAs with the first close makes macd and its signal
+        # start at exactly 0, so the recurrences need no first-bar branch.
+        state[STATE_PIVOT] = np.float64(close[start])
+        state[STATE_EMA_12] = np.float64(close[start])
+        state[STATE_EMA_26] = np.float64(close[start])
+
+    pivot = state[STATE_PIVOT]
+    sum_10 = state[STATE_SUM_10]
+    sum_20 = state[STATE_SUM_20]
+    sum_50 = state[STATE_SUM_50]
+    avg_gain = state[STATE_AVG_GAIN]
+    avg_loss = state[STATE_AVG_LOSS]
+    tr_sum = state[STATE_TR_SUM]
+    ema_12 = state[STATE_EMA_12]
+    ema_26 = state[STATE_EMA_26]
+    macd_signal = state[STATE_MACD_SIGNAL]
+
+    rolling_std(close, 10, out[:, STD_10], start, seen, pivot, state[STATE_STD_10:STATE_STD_10 + 2])
+    rolling_std(close, 20, out[:, STD_20], start, seen, pivot, state[STATE_STD_20:STATE_STD_20 + 2])
+
+    # The previous close feeds both the RSI delta and the true range; carry
+    # it in a register instead of reloading close[i - 1]
+    prev_close = np.float64(close[start - 1]) if start >= 1 else 0.0
+
+    for i in range(start, n):
+        # g is the bar's position in the whole series, r its output row
+        g = seen + i - start
+        r = i - start
+        c = np.float64(close[i])
+        h = np.float64(high[i])
+        lo = np.float64(low[i])
+
+        # Rolling price windows
+        d = c - pivot
+        sum_10 += d
+        sum_20 += d
+        sum_50 += d
+        if g >= 10:
+            sum_10 -= np.float64(close[i - 10]) - pivot
+        if g >= 20:
+            sum_20 -= np.float64(close[i - 20]) - pivot
+        if g >= 50:
+            sum_50 -= np.float64(close[i - 50]) - pivot
+
+        sma_10 = pivot + sum_10 / 10.0 if g >= 9 else 0.0
+        sma_20 = pivot + sum_20 / 20.0 if g >= 19 else 0.0
+        sma_50 = pivot + sum_50 / 50.0 if g >= 49 else 0.0
+        std_20 = np.float64(out[r, STD_20])
+
+        out[r, SMA_10] = sma_10
+        out[r, SMA_20] = sma_20
+        out[r, SMA_50] = sma_50
+        # One division per average, shared by the ratios that use it
+        inv_10 = safe_recip(sma_10)
+        inv_20 = safe_recip(sma_20)
+        inv_50 = safe_recip(sma_50)
+        out[r, SMA_RATIO_10_20] = sma_10 * inv_20
+        out[r, SMA_RATIO_10_50] = sma_10 * inv_50
+        out[r, PRICE_TO_SMA_10] = c * inv_10
+        out[r, PRICE_TO_SMA_20] = c * inv_20
+
+        bb_upper = sma_20 + 2.0 * std_20
+        bb_lower = sma_20 - 2.0 * std_20
+        out[r, BB_UPPER] = bb_upper
+        out[r, BB_LOWER] = bb_lower
+        out[r, BB_POSITION] = safe_div(c - bb_lower, bb_upper - bb_lower)
+
+        # RSI with Wilder smoothing, seeded by the simple mean of the first
+        # 14 deltas
+        delta = c - prev_close if g >= 1 else 0.0
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+        if g <= 14:
+            avg_gain += gain / 14.0
+            avg_loss += loss / 14.0
+        else:
+            avg_gain = (avg_gain * 13.0 + gain) / 14.0
+            avg_loss = (avg_loss * 13.0 + loss) / 14.0
+        if g < 14:
+            out[r, RSI_14] = 0.0
+        elif avg_loss != 0.0:
+            out[r, RSI_14] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain != 0.0:
+            out[r, RSI_14] = 100.0
+        else:
+            out[r, RSI_14] = 50.0
+
+        # MACD: ema_12, ema_26 and the signal line advance together
+        ema_12 += alpha_12 * (c - ema_12)
+        ema_26 += alpha_26 * (c - ema_26)
+        macd = ema_12 - ema_26
+        macd_signal += alpha_9 * (macd - macd_signal)
+        out[r, MACD] = macd
+        out[r, MACD_SIGNAL] = macd_signal
+        out[r, MACD_HIST] = macd - macd_signal
+
+        # ATR: the first bar has no previous close, so the 14-bar window of
+        # true ranges is complete from g = 14. The outgoing true range is
+        # recomputed from its bar rather than kept in a buffer.
+        if g >= 1:
+            tr_sum += true_range(h, lo, prev_close)
+        if g >= 15:
+            tr_sum -= true_range(
+                np.float64(high[i - 14]), np.float64(low[i - 14]), np.float64(close[i - 15])
+            )
+        out[r, ATR_14] = tr_sum / 14.0 if g >= 14 else 0.0
+
+        prev_close = c
+
+    state[STATE_SEEN] = seen + n - start
+    state[STATE_SUM_10] = sum_10
+    state[STATE_SUM_20] = sum_20
+    state[STATE_SUM_50] = sum_50
+    state[STATE_AVG_GAIN] = avg_gain
+    state[STATE_AVG_LOSS] = avg_loss
+    state[STATE_TR_SUM] = tr_sum
+    state[STATE_EMA_12] = ema_12
+    state[STATE_EMA_26] = ema_26
+    state[STATE_MACD_SIGNAL] = macd_signal
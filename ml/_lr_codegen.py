@@ -0,0 +1,126 @@
+"""
+Generated inference kernels for a trained LR model.
+
+The feature schema and weights are fixed once training finishes, so the
+scaler and logistic regression are written out as a straight-line
+predict_one(x0, ..., x27) with every constant inlined. The module is named
+after a digest of the weights, so a retrained model never picks up a
+stale kernel.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+INFER_PREFIX = "_lr_infer_"
+
+_WEIGHT_KEYS = ('coef', 'intercept', 'mean', 'scale')
+
+
+def weights_digest(weights: dict) -> str:
+    """Short hash of the .npz weights (as written by train_lr_model)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for key in _WEIGHT_KEYS:
+        digest.update(np.ascontiguousarray(weights[key], dtype=np.float32).tobytes())
+    digest.update("\0".join(str(name) for name in weights['names']).encode())
+    return digest.hexdigest()
+
+
+def infer_module_path(weights: dict, directory: str) -> str:
+    return os.path.join(directory, f"{INFER_PREFIX}{weights_digest(weights)}.py")
+
+
+def render_infer_module(weights: dict) -> str:
+    """Source for predict_one, one term per feature in weights['names'] order."""
+    coef = weights['coef'].astype(np.float64)
+    mean = weights['mean'].astype(np.float64)
+    scale = weights['scale'].astype(np.float64)
+
+    args = ", ".join(f"x{i}" for i in range(len(coef)))
+    lines = [
+        f"# Generated by ml/_lr_codegen.py for weights {weights_digest(weights)}. Do not edit.",
+        "import math",
+        "",
+        "from ml._features_numba import njit",
+        "",
+        "FEATURE_NAMES = [",
+    ]
+    lines += [f"    {str(name)!r}," for name in weights['names']]
+    lines += [
+        "]",
+        "",
+        "",
+        "@njit(cache=True)",
+        f"def predict_one({args}):",
+        f"    z = {float(weights['intercept'])!r}",
+    ]
+    for i in range(len(coef)):
+        # (x - mean) / scale * coef, with the division folded into the weight
+        weight = coef[i] / scale[i] if scale[i] != 0 else 0.0
+        lines.append(f"    z += (x{i} - {float(mean[i])!r}) * {float(weight)!r}")
+    lines += [
+        "    return 1.0 / (1.0 + math.exp(-z))",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def write_infer_module(weights: dict, directory: str) -> str:
+    """
+    Write the kernel for these weights.
+
+    Call this before saving the weights themselves: a reader that sees
+    the new .npz must also find its kernel.
+    """
+    path = infer_module_path(weights, directory)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_infer_module(weights))
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def remove_stale_infer_modules(weights: dict, directory: str) -> None:
+    """
+    Delete kernels generated for any weights other than these, along with
+    their __pycache__ entries (the .pyc and numba's .nbi/.nbc index and
+    object files, which are named after the module).
+    """
+    keep = os.path.splitext(os.path.basename(infer_module_path(weights, directory)))[0]
+    patterns = (
+        os.path.join(directory, INFER_PREFIX + "*.py"),
+        os.path.join(directory, "__pycache__", INFER_PREFIX + "*"),
+    )
+    for pattern in patterns:
+        for stale in glob.glob(pattern):
+            name = os.path.basename(stale)
+            if name == keep + ".py" or name.startswith(keep + "."):
+                continue
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def load_infer_module(weights: dict, directory: str):
+    """Return predict_one for these weights, or None if it was never generated."""
+    path = infer_module_path(weights, directory)
+    if not os.path.exists(path):
+        return None
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # numba's on-disk cache re-imports the defining module by name
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    if list(module.FEATURE_NAMES) != [str(n) for n in weights['names']]:
+        return None
+    return module.predict_one
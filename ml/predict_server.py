@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+ML Signal Prediction Worker
+
+Long-lived version of predict_signal.py. The model is loaded once (and
+reloaded when it is retrained), and feature state is kept per symbol, so
+each request only pays for the bars it has not seen yet.
+
+Usage:
+    python -m ml.predict_server
+
+Reads one JSON request per line on stdin:
+    {"id": 1, "symbol": "EURUSD", "bars": [{"time": ..., "open": ..., ...}, ...]}
+
+Writes one JSON result per line on stdout, echoing "id".
+"""
+
+import sys
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from ml.dataset_builder import FeatureState, build_features_tail
+from ml.predict_signal import MIN_BARS, MODEL_PATH, WEIGHTS_PATH, bars_to_frame, load_model
+
+
+@dataclass
+class _SymbolState:
+    features: FeatureState
+    last_time: str
+    last_row: np.ndarray
+
+
+class PredictWorker:
+    """
+    Serves prediction requests against a model loaded once per process.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.model_stamp = None
+        self.symbols = {}
+
+    def _refresh_model(self) -> None:
+        """(Re)load the model if it appeared or was retrained since the last request."""
+        stamp = tuple(
+            os.path.getmtime(path) if os.path.exists(path) else None
+            for path in (WEIGHTS_PATH, MODEL_PATH)
+        )
+        if stamp != self.model_stamp:
+            self.model = load_model()
+            self.model_stamp = stamp
+
+    def _latest_features(self, symbol, df) -> np.ndarray:
+        """
+        Feature row for the last bar in df.
+        
+        With a symbol and bar times, the symbol's FeatureState is advanced by
+        the bars after the last one it saw. Otherwise, or when the history
+        does not line up (unknown time, or the same times with different
+        prices, as after a new backtest or a still-forming last candle),
+        the state is rebuilt from the bars given.
+        """
+        if symbol is None or 'time' not in df.columns:
+            return build_features_tail(df)[0]
+        
+        times = df['time'].astype(str).tolist()
+        entry = self.symbols.get(symbol)
+        
+        if entry is not None and entry.last_time in times:
+            last_seen = times.index(entry.last_time) + 1
+            if entry.features.matches(df.iloc[:last_seen]):
+                new_bars = df.iloc[last_seen:]
+                if len(new_bars) > 0:
+                    entry.last_row = entry.features.update(new_bars)[-1]
+                    entry.last_time = times[-1]
+                return entry.last_row
+        
+        state = FeatureState()
+        row = state.update(df)[-1]
+        self.symbols[symbol] = _SymbolState(state, times[-1], row)
+        return row
+
+    def handle(self, request: dict) -> dict:
+        """Answer one request with the same fields predict_signal returns."""
+        try:
+            self._refresh_model()
+            if self.model is None:
+                return {
+                    "success": False,
+                    "confidence": 0.5,
+                    "error": "Model not trained yet"
+                }
+            feature_names, score = self.model
+            
+            df = bars_to_frame(request.get('bars', []))
+            
+            if len(df) < MIN_BARS:
+                return {
+                    "success": True,
+                    "confidence": 0.5,
+                    "warning": f"Not enough bars for prediction ({len(df)} < {MIN_BARS})"
+                }
+            
+            confidence = score(self._latest_features(request.get('symbol'), df))
+            
+            return {
+                "success": True,
+                "confidence": round(confidence, 4),
+                "features_used": len(feature_names),
+                "bars_analyzed": len(df)
+            }
+        
+        except Exception as e:
+            return {
+                "success": False,
+                "confidence": 0.5,
+                "error": str(e)
+            }
+
+
+def main() -> None:
+    worker = PredictWorker()
+    
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            result = {"success": False, "confidence": 0.5, "error": f"Invalid JSON: {e}"}
+        else:
+            result = worker.handle(request)
+            if 'id' in request:
+                result['id'] = request['id']
+        
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,59 +15,130 @@ import json
 import os
 import numpy as np
 
+MODEL_PATH = "storage/ml_lr_model.joblib"
+WEIGHTS_PATH = "storage/ml_lr_model.npz"
+MIN_BARS = 60
+
+
+def _load_weights(weights_path: str) -> dict:
+    """Load the coef/intercept/mean/scale/names arrays written by train_lr_model."""
+    with np.load(weights_path, allow_pickle=False) as w:
+        return {key: w[key] for key in w.files}
+
+
+def _fast_predict(x_row: np.ndarray, weights: dict) -> float:
+    """Scaler + logistic regression probability using plain numpy."""
+    z = ((x_row - weights['mean']) / weights['scale']) @ weights['coef'] + weights['intercept']
+    return float(1.0 / (1.0 + np.exp(-z)))
+
+
+def _load_infer_kernel(weights: dict):
+    """The generated predict_one for these weights, or None to use _fast_predict."""
+    from ml._lr_codegen import load_infer_module
+    
+    try:
+        return load_infer_module(weights, os.path.dirname(WEIGHTS_PATH) or ".")
+    except Exception as e:
+        print(f"Warning: could not load inference kernel: {e}", file=sys.stderr)
+        return None
+
+
+def load_model():
+    """
+    Load the trained model.
+    
+    Returns (feature_names, score), where score maps a feature row in
+    FEATURE_NAMES order to the probability of an up move, or None if no
+    model has been trained yet. Prefers the kernel generated for the .npz
+    weights, then the weights themselves; falls back to the joblib
+    pipeline for models trained before either existed.
+    """
+    from ml._features_numba import COLUMN_INDEX
+    
+    if os.path.exists(WEIGHTS_PATH):
+        weights = _load_weights(WEIGHTS_PATH)
+        feature_names = [str(name) for name in weights['names']]
+        columns = [COLUMN_INDEX[name] for name in feature_names]
+        
+        predict_one = _load_infer_kernel(weights)
+        if predict_one is not None:
+            if columns == list(range(len(columns))):
+                return feature_names, lambda row: float(predict_one(*row.tolist()))
+            return feature_names, lambda row: float(predict_one(*row[columns].tolist()))
+        
+        return feature_names, lambda row: _fast_predict(row[columns], weights)
+    
+    if os.path.exists(MODEL_PATH):
+        import joblib
+        
+        pipeline = joblib.load(MODEL_PATH)
+        model = pipeline['model']
+        scaler = pipeline['scaler']
+        feature_names = pipeline['feature_names']
+        columns = [COLUMN_INDEX[name] for name in feature_names]
+        
+        def score(row: np.ndarray) -> float:
+            if not hasattr(model, 'predict_proba'):
+                return 0.5
+            X_scaled = scaler.transform(row[columns].reshape(1, -1))
+            return float(model.predict_proba(X_scaled)[0][1])
+        
+        return feature_names, score
+    
+    return None
+
+
+def bars_to_frame(bars: list):
+    """Convert a list of bar dicts into a numeric OHLCV DataFrame."""
+    import pandas as pd
+    
+    df = pd.DataFrame(bars)
+    
+    for col in ['open', 'high', 'low', 'close']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    if 'tick_volume' in df.columns:
+        df['volume'] = pd.to_numeric(df['tick_volume'], errors='coerce')
+    elif 'volume' in df.columns:
+        df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
+    else:
+        df['volume'] = 0
+    
+    return df
+
+
 def predict_signal(bars_json: str) -> dict:
     """
     Predict confidence for a trading signal based on recent bars.
+    
+    One-shot entry point: loads the model on every call. Long-running
+    callers should use ml/predict_server.py instead.
     """
     try:
         bars = json.loads(bars_json)
         
-        model_path = "storage/ml_lr_model.joblib"
-        if not os.path.exists(model_path):
+        model = load_model()
+        if model is None:
             return {
                 "success": False,
                 "confidence": 0.5,
                 "error": "Model not trained yet"
             }
+        feature_names, score = model
         
-        import pandas as pd
-        import joblib
-        from ml.dataset_builder import build_features
-        
-        df = pd.DataFrame(bars)
-        
-        for col in ['open', 'high', 'low', 'close']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        from ml.dataset_builder import build_features_tail
         
-        if 'tick_volume' in df.columns:
-            df['volume'] = pd.to_numeric(df['tick_volume'], errors='coerce')
-        elif 'volume' in df.columns:
-            df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-        else:
-            df['volume'] = 0
+        df = bars_to_frame(bars)
         
-        if len(df) < 60:
+        if len(df) < MIN_BARS:
             return {
                 "success": True,
                 "confidence": 0.5,
-                "warning": f"Not enough bars for prediction ({len(df)} < 60)"
+                "warning": f"Not enough bars for prediction ({len(df)} < {MIN_BARS})"
             }
         
-        features = build_features(df)
-        
-        pipeline = joblib.load(model_path)
-        model = pipeline['model']
-        scaler = pipeline['scaler']
-        feature_names = pipeline['feature_names']
-        
-        X = features[feature_names].iloc[-1:].values
-        X_scaled = scaler.transform(X)
-        
-        if hasattr(model, 'predict_proba'):
-            proba = model.predict_proba(X_scaled)
-            confidence = float(proba[0][1])
-        else:
-            confidence = 0.5
+        features = build_features_tail(df)
+        confidence = score(features[0])
         
         return {
             "success": True,
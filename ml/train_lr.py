@@ -1,10 +1,11 @@
 import pandas as pd
 import numpy as np
+import math
 import os
+import tempfile
 
 try:
     from sklearn.linear_model import LogisticRegression
-    from sklearn.model_selection import train_test_split
     from sklearn.preprocessing import StandardScaler
     from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
     import joblib
@@ -12,7 +13,15 @@ try:
 except ImportError:
     SKLEARN_AVAILABLE = False
 
-from ml.dataset_builder import build_features, build_labels
+from ml.dataset_builder import (
+    FEATURE_NAMES,
+    N_FEATURES,
+    STREAM_CHUNK_ROWS,
+    build_features_chunked,
+    build_labels,
+    load_bars,
+)
+from ml._lr_codegen import remove_stale_infer_modules, write_infer_module
 
 
 def train_lr_model(
@@ -20,7 +29,8 @@ def train_lr_model(
     horizon: int = 10,
     threshold: float = 0.001,
     model_path: str = "storage/ml_lr_model.joblib",
-    test_size: float = 0.2
+    test_size: float = 0.2,
+    chunk_rows: int = STREAM_CHUNK_ROWS
 ) -> dict:
     """
     Train a Logistic Regression model for trade prediction.
@@ -31,6 +41,7 @@ def train_lr_model(
         threshold: Minimum return to consider as profitable
         model_path: Where to save the trained model
         test_size: Fraction of data for testing
+        chunk_rows: Bars featurised per chunk while building the training set
     
     Returns:
         dict with training metrics
@@ -41,37 +52,61 @@ def train_lr_model(
             "error": "scikit-learn not installed. Run: pip install scikit-learn joblib"
         }
     
-    print(f"Building features from {len(df)} bars...")
-    X = build_features(df)
     y = build_labels(df, horizon=horizon, threshold=threshold)
     
-    valid_idx = ~(X.isna().any(axis=1) | y.isna())
-    valid_idx = valid_idx & (valid_idx.index < len(df) - horizon)
-    
-    X = X[valid_idx]
-    y = y[valid_idx]
+    # The last `horizon` bars have no future return to label
+    n_samples = max(len(df) - horizon, 0)
+    y = y.iloc[:n_samples]
     
-    print(f"Training samples: {len(X)}")
+    print(f"Training samples: {n_samples}")
     print(f"Class distribution: {y.value_counts().to_dict()}")
     
-    if len(X) < 100:
+    if n_samples < 100:
         return {
             "success": False,
-            "error": f"Not enough training data: {len(X)} samples (need at least 100)"
+            "error": f"Not enough training data: {n_samples} samples (need at least 100)"
         }
     
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=42, shuffle=False
-    )
+    # Chronological split, same as train_test_split(shuffle=False)
+    n_train = n_samples - math.ceil(n_samples * test_size)
     
+    # Stream the feature matrix chunk by chunk: each chunk is copied once
+    # into a single float32 buffer while the scaler statistics are
+    # accumulated with partial_fit, instead of materialising, filtering,
+    # splitting and scaling full-size copies. The buffer is a memmap over
+    # an anonymous temp file next to the model, so the OS can page it out
+    # rather than it having to fit in RAM.
+    print(f"Building features from {len(df)} bars...")
+    buffer_dir = os.path.dirname(model_path) or "."
+    os.makedirs(buffer_dir, exist_ok=True)
+    buffer_file = tempfile.TemporaryFile(dir=buffer_dir, suffix=".features")
+    X = np.memmap(buffer_file, dtype=np.float32, mode='w+', shape=(n_samples, N_FEATURES))
     scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    
+    offset = 0
+    for chunk in build_features_chunked(df, chunk_rows=chunk_rows):
+        rows = chunk.to_numpy()[:n_samples - offset]
+        if len(rows) == 0:
+            break
+        X[offset:offset + len(rows)] = rows
+        train_rows = rows[:max(n_train - offset, 0)]
+        if len(train_rows) > 0:
+            scaler.partial_fit(train_rows)
+        offset += len(rows)
+    
+    X -= scaler.mean_.astype(np.float32)
+    X /= scaler.scale_.astype(np.float32)
+    
+    X_train_scaled, X_test_scaled = X[:n_train], X[n_train:]
+    y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
     
     print("Training Logistic Regression model...")
+    # 28 features: Newton steps on the d x d Hessian converge in a handful
+    # of iterations, where lbfgs needs many cheap ones
     model = LogisticRegression(
         C=1.0,
-        max_iter=1000,
+        solver='newton-cholesky',
+        max_iter=100,
         random_state=42,
         class_weight='balanced'
     )
@@ -85,11 +120,14 @@ def train_lr_model(
         "precision": precision_score(y_test, y_pred, zero_division=0),
         "recall": recall_score(y_test, y_pred, zero_division=0),
         "f1_score": f1_score(y_test, y_pred, zero_division=0),
-        "train_samples": len(X_train),
-        "test_samples": len(X_test),
+        "train_samples": len(X_train_scaled),
+        "test_samples": len(X_test_scaled),
         "feature_count": X.shape[1],
     }
     
+    del X, X_train_scaled, X_test_scaled
+    buffer_file.close()
+    
     print(f"\nModel Performance:")
     print(f"  Accuracy:  {metrics['accuracy']:.4f}")
     print(f"  Precision: {metrics['precision']:.4f}")
@@ -101,14 +139,43 @@ def train_lr_model(
     pipeline = {
         'model': model,
         'scaler': scaler,
-        'feature_names': list(X.columns)
+        'feature_names': list(FEATURE_NAMES)
     }
     joblib.dump(pipeline, model_path)
     print(f"\nModel saved to: {model_path}")
     
+    # Raw weights for the prediction hot path, which skips sklearn entirely
+    weights_path = os.path.splitext(model_path)[0] + ".npz"
+    weights = {
+        'coef': model.coef_[0].astype(np.float32),
+        'intercept': np.float32(model.intercept_[0]),
+        'mean': scaler.mean_.astype(np.float32),
+        'scale': scaler.scale_.astype(np.float32),
+        'names': np.array(FEATURE_NAMES, dtype=str)
+    }
+    weights_dir = os.path.dirname(weights_path) or "."
+    
+    # The kernel goes first: the prediction worker reloads as soon as the
+    # .npz changes and must find the matching kernel by then
+    try:
+        infer_path = write_infer_module(weights, weights_dir)
+        print(f"Inference kernel saved to: {infer_path}")
+    except OSError as e:
+        print(f"Warning: could not write inference kernel: {e}")
+    
+    # Written under a temporary name and moved into place, so a reader
+    # never loads a half-written file
+    tmp_path = os.path.splitext(weights_path)[0] + ".tmp.npz"
+    np.savez(tmp_path, **weights)
+    os.replace(tmp_path, weights_path)
+    print(f"Weights saved to: {weights_path}")
+    
+    remove_stale_infer_modules(weights, weights_dir)
+    
     return {
         "success": True,
         "model_path": model_path,
+        "weights_path": weights_path,
         "metrics": metrics
     }
 
@@ -117,7 +184,7 @@ if __name__ == "__main__":
     bars_path = "storage/backtests/latest_bars.csv"
     
     if os.path.exists(bars_path):
-        df = pd.read_csv(bars_path)
+        df = load_bars(bars_path)
         result = train_lr_model(df)
         print(result)
     else:
@@ -0,0 +1,98 @@
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process";
+import * as readline from "readline";
+
+export interface PredictionResult {
+  success: boolean;
+  confidence: number;
+  error?: string;
+  warning?: string;
+  features_used?: number;
+  bars_analyzed?: number;
+}
+
+// One long-lived `python3 -m ml.predict_server` process answers every
+// prediction, so the interpreter and the model are only loaded once.
+let worker: ChildProcessWithoutNullStreams | null = null;
+let nextId = 1;
+const pending = new Map<number, (result: PredictionResult) => void>();
+
+// Longer than a cold start, which may JIT-compile the feature kernels.
+const PREDICT_TIMEOUT_MS = 30000;
+
+function failPending(error: string) {
+  pending.forEach((resolve) => resolve({ success: false, confidence: 0.5, error }));
+  pending.clear();
+}
+
+function getWorker(): ChildProcessWithoutNullStreams {
+  if (worker) {
+    return worker;
+  }
+
+  const proc = spawn("python3", ["-m", "ml.predict_server"], {
+    cwd: process.cwd(),
+    env: { ...process.env },
+  });
+
+  readline.createInterface({ input: proc.stdout }).on("line", (line) => {
+    try {
+      const result = JSON.parse(line);
+      const resolve = pending.get(result.id);
+      if (resolve) {
+        pending.delete(result.id);
+        resolve(result);
+      }
+    } catch (e) {
+      console.error("ML prediction parse error:", e);
+    }
+  });
+
+  proc.stderr.on("data", (data) => {
+    console.error(`ML Predictor: ${data}`);
+  });
+
+  proc.stdin.on("error", (err) => {
+    console.error(`ML Predictor stdin error: ${err.message}`);
+  });
+
+  proc.on("exit", (code) => {
+    if (worker === proc) {
+      worker = null;
+    }
+    failPending(`Prediction worker exited with code ${code}`);
+  });
+
+  proc.on("error", (err) => {
+    if (worker === proc) {
+      worker = null;
+    }
+    failPending(`Failed to start prediction worker: ${err.message}`);
+  });
+
+  worker = proc;
+  return proc;
+}
+
+export function predictSignal(
+  symbol: string,
+  bars: Record<string, string>[]
+): Promise<PredictionResult> {
+  return new Promise((resolve) => {
+    const id = nextId++;
+    const proc = getWorker();
+
+    const timer = setTimeout(() => {
+      if (pending.delete(id)) {
+        resolve({ success: false, confidence: 0.5, error: "Prediction timed out" });
+        // A worker that stopped answering would stall every later request
+        proc.kill();
+      }
+    }, PREDICT_TIMEOUT_MS);
+
+    pending.set(id, (result) => {
+      clearTimeout(timer);
+      resolve(result);
+    });
+    proc.stdin.write(JSON.stringify({ id, symbol, bars }) + "\n");
+  });
+}
@@ -9,6 +9,7 @@ import {
 } from "@shared/schema";
 import type { BacktestResult, BacktestTrade } from "@shared/schema";
 import { spawn } from "child_process";
+import { predictSignal } from "./predictor";
 import * as fs from "fs";
 import * as path from "path";
 
@@ -590,36 +591,11 @@ export async function registerRoutes(
             return obj;
           });
 
-          const python = spawn("python3", [
-            "-c",
-            `
-import sys
-import json
-sys.path.insert(0, '.')
-from ml.predict_signal import predict_signal
-bars = ${JSON.stringify(JSON.stringify(bars))}
-result = predict_signal(bars)
-print(json.dumps(result))
-            `
-          ], { cwd: process.cwd() });
-
-          let stdout = "";
-          python.stdout.on("data", (data) => { stdout += data.toString(); });
-          
-          await new Promise<void>((resolve) => {
-            python.on("close", () => {
-              try {
-                const result = JSON.parse(stdout.trim());
-                if (result.success) {
-                  confidence = result.confidence;
-                  mlUsed = true;
-                }
-              } catch (e) {
-                console.error("ML prediction parse error:", e);
-              }
-              resolve();
-            });
-          });
+          const result = await predictSignal(symbol, bars);
+          if (result.success) {
+            confidence = result.confidence;
+            mlUsed = true;
+          }
         } catch (e) {
           console.error("ML prediction error:", e);
         }
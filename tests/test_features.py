@@ -0,0 +1,150 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.dataset_builder import (
+    FeatureState,
+    _has_volume,
+    build_features,
+    build_features_chunked,
+    build_features_tail,
+)
+
+
+def _bars(n: int = 10000, volume: bool = True, seed: int = 7) -> pd.DataFrame:
+    """Random-walk OHLCV bars around 1.1, like an FX pair."""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 5e-4, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 3e-4, n))
+    df = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+    })
+    if volume:
+        df['tick_volume'] = rng.integers(1, 500, n)
+    return df
+
+
+@pytest.mark.parametrize("volume", [True, False])
+def test_chunked_matches_single_pass(volume):
+    df = _bars(volume=volume)
+    full = build_features(df).to_numpy()
+
+    chunked = pd.concat(build_features_chunked(df, chunk_rows=257)).to_numpy()
+
+    np.testing.assert_array_equal(chunked, full)
+
+
+@pytest.mark.parametrize("volume", [True, False])
+def test_feature_state_matches_single_pass(volume):
+    df = _bars(volume=volume)
+    full = build_features(df).to_numpy()
+
+    state = FeatureState()
+    bounds = [0, 1, 3, 49, 50, 51, 120, 121, 1000, len(df)]
+    rows = [state.update(df.iloc[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    np.testing.assert_array_equal(np.vstack(rows), full)
+    assert state.bars_seen == len(df)
+
+
+def test_feature_state_volume_seen_late():
+    # Zero volume for the first 100 bars, then real volume
+    df = _bars(1000)
+    df.loc[:99, 'tick_volume'] = 0
+    full = build_features(df)
+
+    state = FeatureState()
+    rows = np.vstack([state.update(df.iloc[:100]), state.update(df.iloc[100:])])
+
+    # Only rows emitted before any volume was seen differ, and only in volume_ratio
+    ratio = full.columns.get_loc('volume_ratio')
+    np.testing.assert_array_equal(rows[:100, ratio], 1.0)
+    np.testing.assert_array_equal(full.to_numpy()[:100, ratio], 0.0)
+    np.testing.assert_array_equal(np.delete(rows, ratio, axis=1), np.delete(full.to_numpy(), ratio, axis=1))
+    np.testing.assert_array_equal(rows[100:], full.to_numpy()[100:])
+    assert state.has_volume
+
+
+def test_non_finite_bars_do_not_stick():
+    df = _bars()
+    bad = df.copy()
+    bad.loc[1000, 'close'] = np.nan
+    bad.loc[1500, 'tick_volume'] = np.nan
+    bad.loc[2000, 'high'] = np.inf
+
+    full = build_features(bad).to_numpy()
+    assert np.isfinite(full).all()
+
+    # Forward-filling only touches the windows around the bad bars
+    np.testing.assert_allclose(full[-500:], build_features(df).to_numpy()[-500:], rtol=1e-5, atol=1e-6)
+
+    state = FeatureState()
+    rows = [state.update(bad.iloc[a:b]) for a, b in [(0, 1000), (1000, 1001), (1001, len(bad))]]
+    np.testing.assert_array_equal(np.vstack(rows), full)
+    np.testing.assert_array_equal(pd.concat(build_features_chunked(bad, chunk_rows=333)).to_numpy(), full)
+
+
+def test_tail_close_to_single_pass():
+    df = _bars()
+    full = build_features(df).to_numpy()
+
+    np.testing.assert_allclose(build_features_tail(df, tail=5), full[-5:], rtol=1e-4, atol=1e-6)
+
+
+def test_sma_ratios():
+    df = _bars()
+    features = build_features(df)
+    rows = features.iloc[60:]
+    close = df['close'].to_numpy(dtype=np.float32)[60:]
+
+    np.testing.assert_allclose(rows['sma_ratio_10_20'], rows['sma_10'] / rows['sma_20'], rtol=1e-6)
+    np.testing.assert_allclose(rows['sma_ratio_10_50'], rows['sma_10'] / rows['sma_50'], rtol=1e-6)
+    np.testing.assert_allclose(rows['price_to_sma_10'], close / rows['sma_10'], rtol=1e-6)
+    np.testing.assert_allclose(rows['price_to_sma_20'], close / rows['sma_20'], rtol=1e-6)
+
+
+def test_feature_state_matches():
+    df = _bars(200)
+    state = FeatureState()
+    state.update(df.iloc[:150])
+
+    assert state.matches(df.iloc[:150])
+    assert state.matches(df.iloc[140:150])
+    assert not state.matches(df.iloc[:151])
+
+    moved = df.iloc[:150].copy()
+    moved.loc[149, 'close'] += 1e-3
+    assert not state.matches(moved)
+
+
+def test_matches_pure_python_fallback(tmp_path):
+    # Hide numba from a fresh interpreter so the kernels run as plain Python
+    bars_path = tmp_path / "bars.csv"
+    out_path = tmp_path / "features.npy"
+    _bars(600).to_csv(bars_path, index=False)
+    script = (
+        "import sys; sys.modules['numba'] = None\n"
+        "import numpy as np, pandas as pd\n"
+        "from ml.dataset_builder import build_features\n"
+        f"np.save({str(out_path)!r}, build_features(pd.read_csv({str(bars_path)!r})).to_numpy())\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).resolve().parents[1])
+
+    expected = build_features(pd.read_csv(bars_path)).to_numpy()
+    np.testing.assert_array_equal(np.load(out_path), expected)
+
+
+def test_nan_volume_still_counts_as_volume():
+    volume = np.array([np.nan, 0.0, 12.0], dtype=np.float32)
+
+    assert _has_volume(volume)
+    assert not _has_volume(np.array([np.nan, 0.0], dtype=np.float32))
+    assert not _has_volume(np.array([], dtype=np.float32))
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import dataset_builder
+from ml.dataset_builder import load_bars
+
+needs_pyarrow = pytest.mark.skipif(not dataset_builder.PYARROW_AVAILABLE, reason="pyarrow not installed")
+
+
+def _write_bars(path, close: float) -> None:
+    pd.DataFrame({
+        'time': ['2024-01-01 00:00', '2024-01-01 00:01', '2024-01-01 00:02'],
+        'open': [1.1, 1.2, 1.3],
+        'high': [1.2, 1.3, 1.4],
+        'low': [1.0, 1.1, 1.2],
+        'close': [1.15, 1.25, close],
+        'tick_volume': [10, 20, 30],
+    }).to_csv(path, index=False)
+
+
+def _set_mtime(path, mtime: float) -> None:
+    os.utime(path, (mtime, mtime))
+
+
+@needs_pyarrow
+def test_parquet_copy_written_and_reused(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    parquet_path = tmp_path / "bars.parquet"
+    _write_bars(csv_path, close=1.35)
+
+    first = load_bars(str(csv_path))
+    assert parquet_path.exists()
+    assert list(first.columns) == ['open', 'high', 'low', 'close', 'tick_volume']
+    assert (first.dtypes == np.float32).all()
+
+    # Change the CSV but leave it older than the copy: the copy wins
+    _write_bars(csv_path, close=9.0)
+    _set_mtime(csv_path, 1_000_000)
+    _set_mtime(parquet_path, 2_000_000)
+    pd.testing.assert_frame_equal(load_bars(str(csv_path)), first)
+
+
+@needs_pyarrow
+def test_newer_csv_rebuilds_parquet_copy(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    parquet_path = tmp_path / "bars.parquet"
+    _write_bars(csv_path, close=1.35)
+    load_bars(str(csv_path))
+
+    _write_bars(csv_path, close=9.0)
+    _set_mtime(parquet_path, 1_000_000)
+    _set_mtime(csv_path, 2_000_000)
+
+    assert load_bars(str(csv_path))['close'].iloc[-1] == np.float32(9.0)
+    assert os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    assert load_bars(str(csv_path))['close'].iloc[-1] == np.float32(9.0)
+
+
+def test_csv_only_loads_float32(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_builder, 'PYARROW_AVAILABLE', False)
+    csv_path = tmp_path / "bars.csv"
+    _write_bars(csv_path, close=1.35)
+
+    df = load_bars(str(csv_path))
+
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'tick_volume']
+    assert (df.dtypes == np.float32).all()
+    assert not (tmp_path / "bars.parquet").exists()
@@ -0,0 +1,60 @@
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from ml._lr_codegen import (
+    infer_module_path,
+    load_infer_module,
+    render_infer_module,
+    write_infer_module,
+)
+from ml.predict_signal import _fast_predict
+
+
+def _fit(n_features: int = 6, seed: int = 3):
+    """A small scaler + LR fit, its weights as train_lr_model saves them, and held-out rows."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(1.0, 0.5, (400, n_features)).astype(np.float32)
+    y = ((X - 1.0) @ rng.normal(0, 1, n_features) + rng.normal(0, 0.5, 400) > 0).astype(int)
+
+    scaler = StandardScaler().fit(X[:300])
+    model = LogisticRegression().fit(scaler.transform(X[:300]), y[:300])
+    weights = {
+        'coef': model.coef_[0].astype(np.float32),
+        'intercept': np.float32(model.intercept_[0]),
+        'mean': scaler.mean_.astype(np.float32),
+        'scale': scaler.scale_.astype(np.float32),
+        'names': np.array([f"f{i}" for i in range(n_features)], dtype=str)
+    }
+    rows = X[300:]
+    return weights, rows, model.predict_proba(scaler.transform(rows))[:, 1]
+
+
+def test_fast_predict_matches_sklearn():
+    weights, rows, expected = _fit()
+
+    got = np.array([_fast_predict(row, weights) for row in rows])
+
+    np.testing.assert_allclose(got, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_generated_kernel_matches_sklearn(tmp_path):
+    weights, rows, expected = _fit()
+
+    write_infer_module(weights, str(tmp_path))
+    predict_one = load_infer_module(weights, str(tmp_path))
+    got = np.array([predict_one(*row.tolist()) for row in rows])
+
+    np.testing.assert_allclose(got, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_kernel_for_other_names_is_rejected(tmp_path):
+    weights, _, _ = _fit()
+    renamed = dict(weights, names=weights['names'][::-1].copy())
+
+    # A kernel whose FEATURE_NAMES disagree with the weights it is filed under
+    with open(infer_module_path(renamed, str(tmp_path)), "w") as f:
+        f.write(render_infer_module(weights))
+
+    assert load_infer_module(renamed, str(tmp_path)) is None
+    assert load_infer_module(weights, str(tmp_path)) is None
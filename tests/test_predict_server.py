@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml._features_numba import FEATURE_NAMES
+from ml.dataset_builder import FeatureState, build_features_tail
+from ml.predict_server import PredictWorker
+from ml.predict_signal import WEIGHTS_PATH, bars_to_frame
+
+
+def _bar_dicts(n: int = 300, seed: int = 11) -> list:
+    """Random-walk bars as the trading engine sends them, with times."""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 5e-4, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 3e-4, n))
+    volume = rng.integers(1, 500, n)
+    times = pd.date_range('2024-01-01', periods=n, freq='min').strftime('%Y-%m-%dT%H:%M:%S')
+    return [
+        {
+            'time': times[i],
+            'open': float(open_[i]),
+            'high': float(max(open_[i], close[i]) + spread[i]),
+            'low': float(min(open_[i], close[i]) - spread[i]),
+            'close': float(close[i]),
+            'tick_volume': int(volume[i]),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """A PredictWorker over random weights, recording every feature row it scores."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "storage").mkdir()
+    rng = np.random.default_rng(5)
+    n = len(FEATURE_NAMES)
+    np.savez(
+        WEIGHTS_PATH,
+        coef=rng.normal(0, 0.1, n).astype(np.float32),
+        intercept=np.float32(0.0),
+        mean=np.zeros(n, np.float32),
+        scale=np.ones(n, np.float32),
+        names=np.array(FEATURE_NAMES, dtype=str),
+    )
+
+    worker = PredictWorker()
+    worker._refresh_model()
+    names, score = worker.model
+    worker.rows = []
+
+    def recording_score(row):
+        worker.rows.append(row.copy())
+        return score(row)
+
+    worker.model = (names, recording_score)
+    return worker
+
+
+def test_one_bar_advance_reuses_state(worker):
+    bars = _bar_dicts()
+
+    assert worker.handle({'symbol': 'EURUSD', 'bars': bars[:-1]})['success']
+    state = worker.symbols['EURUSD'].features
+    assert worker.handle({'symbol': 'EURUSD', 'bars': bars[1:]})['success']
+
+    assert worker.symbols['EURUSD'].features is state
+    assert state.bars_seen == len(bars)
+    np.testing.assert_array_equal(worker.rows[-1], FeatureState().update(bars_to_frame(bars))[-1])
+
+
+def test_changed_close_forces_rebuild(worker):
+    bars = _bar_dicts()
+
+    worker.handle({'symbol': 'EURUSD', 'bars': bars})
+    state = worker.symbols['EURUSD'].features
+
+    # Same times, but the last candle was still forming
+    moved = [dict(bar) for bar in bars]
+    moved[-1]['close'] += 1e-3
+    moved[-1]['high'] = max(moved[-1]['high'], moved[-1]['close'])
+    worker.handle({'symbol': 'EURUSD', 'bars': moved})
+
+    assert worker.symbols['EURUSD'].features is not state
+    np.testing.assert_array_equal(worker.rows[-1], FeatureState().update(bars_to_frame(moved))[-1])
+    assert not np.array_equal(worker.rows[-1], worker.rows[0])
+
+
+@pytest.mark.parametrize("drop", ['symbol', 'time'])
+def test_without_symbol_or_time_uses_tail(worker, drop):
+    bars = _bar_dicts()
+    request = {'symbol': 'EURUSD', 'bars': bars}
+    if drop == 'symbol':
+        del request['symbol']
+    else:
+        request['bars'] = [{k: v for k, v in bar.items() if k != 'time'} for bar in bars]
+
+    assert worker.handle(request)['success']
+
+    assert worker.symbols == {}
+    np.testing.assert_array_equal(worker.rows[-1], build_features_tail(bars_to_frame(request['bars']))[0])
@@ -15,7 +15,6 @@ This will:
 """
 
 import os
-import pandas as pd
 
 def main():
     bars_path = "storage/backtests/latest_bars.csv"
@@ -31,11 +30,12 @@ def main():
         return
     
     print(f"Loading bars from {bars_path}...")
-    df = pd.read_csv(bars_path)
-    print(f"Loaded {len(df)} bars")
-    
+    from ml.dataset_builder import load_bars
     from ml.train_lr import train_lr_model
     
+    df = load_bars(bars_path)
+    print(f"Loaded {len(df)} bars")
+    
     result = train_lr_model(
         df,
         horizon=10,